@@ -2,6 +2,10 @@ import streamlit as st
 import pandas as pd
 import pdfplumber
 import re
+import hashlib
+import json
+import threading
+from collections import OrderedDict
 from docx import Document
 from io import BytesIO
 from docx.enum.text import WD_COLOR_INDEX
@@ -270,6 +274,156 @@ def highlight_unfilled_placeholders(doc):
                 for para in cell.paragraphs:
                     highlight_placeholder_in_runs(para.runs)
 
+# === Cached Parsing ===
+# Uploads are keyed by their bytes, so a rerun or a changed form field
+# does not re-parse a file that has not changed.
+
+def _norm_scale(s: str) -> str:
+    s = re.sub(r'[^A-Za-z ]', '', str(s))   # letters + spaces only
+    s = re.sub(r'\s+', ' ', s).strip()      # collapse spaces
+    return s
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def parse_cefi_pdf(pdf_bytes: bytes) -> pd.DataFrame:
+    with pdfplumber.open(BytesIO(pdf_bytes)) as pdf:
+        tables = pdf.pages[2].extract_tables()
+    df = pd.concat([pd.DataFrame(tbl) for tbl in tables], ignore_index=True)
+    valid_row_drops = [i for i in [0, 1, 3, 4] if 0 <= i < len(df)]
+    df = df.drop(df.index[valid_row_drops]).reset_index(drop=True)
+    if df.shape[1] > 4:
+        df.iat[0, 3] = df.iat[0, 4]
+        df.iat[0, 4] = ""
+    df.iat[0, 0] = "Total"
+    valid_col_drops = [c for c in [1, 2, 4, 5, 6] if c in df.columns]
+    df = df.drop(columns=valid_col_drops).reset_index(drop=True)
+    cefi_df = df.copy()
+    cefi_df.columns = ["Scale", "Percentile", "SW"]
+    cefi_df["Scale"] = cefi_df["Scale"].apply(_norm_scale)
+    cefi_df["SW"] = cefi_df["SW"].replace({"None": "N/A"}).fillna("N/A")
+    cefi_df["Classification"] = cefi_df["Percentile"].apply(classify)
+    cefi_df["Percentile*"] = cefi_df["Percentile"].apply(format_percentile_with_suffix)
+    return cefi_df
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def parse_wiat_docx(docx_bytes: bytes) -> pd.DataFrame:
+    input_doc = Document(BytesIO(docx_bytes))
+    ae_combined = pd.DataFrame()
+
+    for i, table in enumerate(input_doc.tables):
+        data = [[cell.text.strip() for cell in row.cells] for row in table.rows]
+        df = pd.DataFrame(data)
+        if df.shape[0] > 1:
+            df.columns = df.iloc[0]
+            df = df.drop(index=0).reset_index(drop=True)
+        if df.shape[1] >= 5:
+            ae_df = df.iloc[:, [0, 4]].copy()
+            ae_df.columns = ['Name', 'Percentile']
+            ae_df['Name'] = ae_df['Name'].str.replace(r'[^A-Za-z\s]', '', regex=True).str.strip()
+            ae_combined = pd.concat([ae_combined, ae_df], ignore_index=True)
+
+    if not ae_combined.empty:
+        ae_combined.drop_duplicates(subset='Name', inplace=True)
+        ae_combined["Classification"] = ae_combined["Percentile"].apply(classify)
+        ae_combined["Percentile*"] = ae_combined["Percentile"].apply(format_percentile_with_suffix)
+        ae_combined = ae_combined.replace("-", "#")
+    return ae_combined
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def parse_wisc_docx(docx_bytes: bytes) -> pd.DataFrame:
+    input_wisc_doc = Document(BytesIO(docx_bytes))
+    wisc_combined = pd.DataFrame()
+
+    for i, table in enumerate(input_wisc_doc.tables):
+        data = [[cell.text.strip() for cell in row.cells] for row in table.rows]
+        df = pd.DataFrame(data)
+        if df.shape[0] > 1:
+            df.columns = df.iloc[0]
+            df = df.drop(index=0).reset_index(drop=True)
+            if df.shape[1] >= 5:
+                if i == 5 or i == 15:
+                    ae_df = df.iloc[:, [1, 4]].copy()
+                elif df.shape[1] >= 6:
+                    ae_df = df.iloc[:, [1, 5]].copy()
+                else:
+                    continue
+                ae_df.columns = ['Name', 'Percentile']
+                ae_df['Name'] = ae_df['Name'].str.replace(r'[^A-Za-z\s]', '', regex=True).str.strip()
+                wisc_combined = pd.concat([wisc_combined, ae_df], ignore_index=True)
+
+    if not wisc_combined.empty:
+        wisc_combined.drop_duplicates(subset='Name', inplace=True)
+        wisc_combined["Classification"] = wisc_combined["Percentile"].apply(classify)
+        wisc_combined["Percentile*"] = wisc_combined["Percentile"].apply(format_percentile_with_suffix)
+        wisc_combined = wisc_combined.replace("-", "#")
+    return wisc_combined
+
+# === Report Cache ===
+
+REPORT_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+class ReportCache:
+    """LRU map from request digest to rendered .docx bytes, bounded by total size."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+            return data
+
+    def put(self, key, data):
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= len(old)
+            self._entries[key] = data
+            self.size += len(data)
+            while self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+@st.cache_resource
+def get_report_cache():
+    # Shared by every session on this server.
+    return ReportCache(REPORT_CACHE_MAX_BYTES)
+
+def report_digest(gender, template_bytes, lookup):
+    h = hashlib.sha256()
+    h.update(gender.encode())
+    h.update(hashlib.sha256(template_bytes).digest())
+    h.update(json.dumps(lookup, sort_keys=True, default=str).encode())
+    return h.hexdigest()
+
+def render_report(gender, template_path, lookup):
+    with open(template_path, "rb") as f:
+        template_bytes = f.read()
+    cache = get_report_cache()
+    key = report_digest(gender, template_bytes, lookup)
+    report = cache.get(key)
+    if report is not None:
+        return report
+
+    template_doc = Document(BytesIO(template_bytes))
+    replace_placeholders(template_doc, lookup)
+    superscript_suffixes(template_doc)
+    delete_rows_with_dash(template_doc)
+    delete_rows_with_unfilled_placeholders(template_doc)
+    highlight_unfilled_placeholders(template_doc)
+
+    output = BytesIO()
+    template_doc.save(output)
+    report = output.getvalue()
+    cache.put(key, report)
+    return report
+
 # === Streamlit App ===
 
 st.title("\U0001F4C4 Report Writer")
@@ -355,31 +509,10 @@ with tab5:
         "Upload CEFI Teacher Report (.pdf)", type="pdf", key="cefi_teacher_upload"
     )
     
-    def _norm_scale(s: str) -> str:
-        s = re.sub(r'[^A-Za-z ]', '', str(s))   # letters + spaces only
-        s = re.sub(r'\s+', ' ', s).strip()      # collapse spaces
-        return s
-            
     cefi_df = pd.DataFrame()
     if uploaded_cefi_parent:
         try:
-            with pdfplumber.open(uploaded_cefi_parent) as pdf:
-                tables = pdf.pages[2].extract_tables()
-            df = pd.concat([pd.DataFrame(tbl) for tbl in tables], ignore_index=True)
-            valid_row_drops = [i for i in [0, 1, 3, 4] if 0 <= i < len(df)]
-            df = df.drop(df.index[valid_row_drops]).reset_index(drop=True)
-            if df.shape[1] > 4:
-                df.iat[0, 3] = df.iat[0, 4]
-                df.iat[0, 4] = ""
-            df.iat[0, 0] = "Total"
-            valid_col_drops = [c for c in [1, 2, 4, 5, 6] if c in df.columns]
-            df = df.drop(columns=valid_col_drops).reset_index(drop=True)
-            cefi_df = df.copy()
-            cefi_df.columns = ["Scale", "Percentile", "SW"]
-            cefi_df["Scale"] = cefi_df["Scale"].apply(_norm_scale)
-            cefi_df["SW"] = cefi_df["SW"].replace({"None": "N/A"}).fillna("N/A")
-            cefi_df["Classification"] = cefi_df["Percentile"].apply(classify)
-            cefi_df["Percentile*"] = cefi_df["Percentile"].apply(format_percentile_with_suffix)
+            cefi_df = parse_cefi_pdf(uploaded_cefi_parent.getvalue())
             st.session_state["cefi_df"] = cefi_df
         except Exception as e:
             st.error(f"Error processing CEFI Parent PDF: {e}")
@@ -388,23 +521,7 @@ with tab5:
     cefi_teacher_df = pd.DataFrame()
     if uploaded_cefi_teacher:
         try:
-            with pdfplumber.open(uploaded_cefi_teacher) as pdf:
-                tables = pdf.pages[2].extract_tables()
-            df = pd.concat([pd.DataFrame(tbl) for tbl in tables], ignore_index=True)
-            valid_row_drops = [i for i in [0, 1, 3, 4] if 0 <= i < len(df)]
-            df = df.drop(df.index[valid_row_drops]).reset_index(drop=True)
-            if df.shape[1] > 4:
-                df.iat[0, 3] = df.iat[0, 4]
-                df.iat[0, 4] = ""
-            df.iat[0, 0] = "Total"
-            valid_col_drops = [c for c in [1, 2, 4, 5, 6] if c in df.columns]
-            df = df.drop(columns=valid_col_drops).reset_index(drop=True)
-            cefi_teacher_df = df.copy()
-            cefi_teacher_df.columns = ["Scale", "Percentile", "SW"]
-            cefi_teacher_df["Scale"] = cefi_teacher_df["Scale"].apply(_norm_scale)
-            cefi_teacher_df["SW"] = cefi_teacher_df["SW"].replace({"None": "N/A"}).fillna("N/A")
-            cefi_teacher_df["Classification"] = cefi_teacher_df["Percentile"].apply(classify)
-            cefi_teacher_df["Percentile*"] = cefi_teacher_df["Percentile"].apply(format_percentile_with_suffix)
+            cefi_teacher_df = parse_cefi_pdf(uploaded_cefi_teacher.getvalue())
             st.session_state["cefi_teacher_df"] = cefi_teacher_df
         except Exception as e:
             st.error(f"Error processing CEFI Teacher PDF: {e}")
@@ -477,43 +594,14 @@ with tab7:
     else:
         # 3) Once both are present, show the generate button
         if st.button("Generate Combined Report"):
-            # … your existing document-generation logic here …
-            input_doc    = Document(uploaded_doc)
             template_path = (
                 "template_male.docx"
                 if gender_selection == "Male"
                 else "template_female.docx"
             )
-            template_doc = Document(template_path)
-        
-            # 2) (Now your existing AE‐table loops, placeholder‐replacing, superscripting, etc.)
-        
-            # 3) Save into bytes
-            output = BytesIO()
-            template_doc.save(output)
-            st.session_state["generated_report"] = output.getvalue()            
-            st.success("✅ Combined document generated successfully!")
 
             # === Process WIAT Tables ===
-            ae_combined = pd.DataFrame()
-
-            for i, table in enumerate(input_doc.tables):
-                data = [[cell.text.strip() for cell in row.cells] for row in table.rows]
-                df = pd.DataFrame(data)
-                if df.shape[0] > 1:
-                    df.columns = df.iloc[0]
-                    df = df.drop(index=0).reset_index(drop=True)
-                if df.shape[1] >= 5:
-                    ae_df = df.iloc[:, [0, 4]].copy()
-                    ae_df.columns = ['Name', 'Percentile']
-                    ae_df['Name'] = ae_df['Name'].str.replace(r'[^A-Za-z\s]', '', regex=True).str.strip()
-                    ae_combined = pd.concat([ae_combined, ae_df], ignore_index=True)
-                    
-            if not ae_combined.empty:
-                ae_combined.drop_duplicates(subset='Name', inplace=True)
-                ae_combined["Classification"] = ae_combined["Percentile"].apply(classify)
-                ae_combined["Percentile*"] = ae_combined["Percentile"].apply(format_percentile_with_suffix)
-                ae_combined = ae_combined.replace("-", "#")
+            ae_combined = parse_wiat_docx(uploaded_doc.getvalue())
 
             lookup = {}
             for _, row in ae_combined.iterrows():
@@ -601,32 +689,9 @@ with tab7:
                 lookup["CEFI Heading"] = "The percentiles for the teacher rating scales are presented in the table that follows."
                 
             # === WISC
-            input_wisc_doc = Document(uploaded_wisc)
-            wisc_combined = pd.DataFrame()
-
-            for i, table in enumerate(input_wisc_doc.tables):
-                data = [[cell.text.strip() for cell in row.cells] for row in table.rows]
-                df = pd.DataFrame(data)
-                if df.shape[0] > 1:
-                    df.columns = df.iloc[0]
-                    df = df.drop(index=0).reset_index(drop=True)
-                    if df.shape[1] >= 5:
-                        if i == 5 or i == 15:
-                            ae_df = df.iloc[:, [1, 4]].copy()
-                        elif df.shape[1] >= 6:
-                            ae_df = df.iloc[:, [1, 5]].copy()
-                        else:
-                            continue
-                        ae_df.columns = ['Name', 'Percentile']
-                        ae_df['Name'] = ae_df['Name'].str.replace(r'[^A-Za-z\s]', '', regex=True).str.strip()
-                        wisc_combined = pd.concat([wisc_combined, ae_df], ignore_index=True)
+            wisc_combined = parse_wisc_docx(uploaded_wisc.getvalue())
 
             if not wisc_combined.empty:
-                wisc_combined.drop_duplicates(subset='Name', inplace=True)
-                wisc_combined["Classification"] = wisc_combined["Percentile"].apply(classify)
-                wisc_combined["Percentile*"] = wisc_combined["Percentile"].apply(format_percentile_with_suffix)
-                wisc_combined = wisc_combined.replace("-", "#")
-
                 for _, row in wisc_combined.iterrows():
                     name = row['Name'].strip()
                     lookup[f"{name} Classification"] = row['Classification']
@@ -660,16 +725,10 @@ with tab7:
 
             # === Fill and output unified report
             lookup = {re.sub(r"\s+", " ", k.strip()): v for k, v in lookup.items()}
-            replace_placeholders(template_doc, lookup)
-            superscript_suffixes(template_doc)
-            delete_rows_with_dash(template_doc)
-            delete_rows_with_unfilled_placeholders(template_doc)
-            highlight_unfilled_placeholders(template_doc)
-
-            output = BytesIO()
-            template_doc.save(output)
-            st.session_state["generated_report"] = output.getvalue()
-            
+            st.session_state["generated_report"] = render_report(
+                gender_selection, template_path, lookup
+            )
+            st.success("✅ Combined document generated successfully!")
 
         if st.session_state.get("generated_report"):
             output_data = BytesIO(st.session_state["generated_report"])
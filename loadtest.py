@@ -0,0 +1,381 @@
+"""Headless multi-session load test for the Report Writer app.
+
+Drives ``combined.py`` through Streamlit's ``AppTest`` with N concurrent
+simulated sessions. Each session uploads synthetic WIAT/WISC (.docx) and
+CEFI (.pdf) files, fills the ChAMP, Beery and CBRS fields and presses
+Generate, then the harness reports latency percentiles, throughput and
+peak RSS.
+
+Usage:
+    python loadtest.py --sessions 8 --requests 5
+
+Every session runs in its own process: ``AppTest`` swaps a process-wide
+runtime in and out around each run, so sessions cannot share a process.
+A real ``streamlit run`` server keeps all sessions in one process, so use
+the per-session RSS to size memory and watch how latency grows with
+``--sessions`` rather than reading throughput as an exact server figure.
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import resource
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+from docx import Document
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_PATH = os.path.join(APP_DIR, "combined.py")
+
+DOCX_MIME = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+PDF_MIME = "application/pdf"
+
+# === Synthetic Inputs ===
+
+WIAT_SUBTESTS = [
+    "Total Achievement", "Oral Language", "Listening Comprehension",
+    "Receptive Vocabulary", "Oral Discourse Comprehension", "Oral Expression",
+    "Expressive Vocabulary", "Oral Word Fluency", "Sentence Repetition",
+    "Reading", "Word Reading", "Reading Comprehension", "Basic Reading",
+    "Pseudoword Decoding", "Decoding", "Reading Fluency",
+    "Oral Reading Fluency", "Decoding Fluency", "Orthographic Fluency",
+    "Phonemic Proficiency", "Written Expression", "Spelling",
+    "Sentence Composition", "Sentence Building", "Sentence Combining",
+    "Essay Composition", "Sentence Writing Fluency", "Mathematics",
+    "Math Problem Solving", "Numerical Operations", "Math Fluency",
+    "Math Fluency-Addition", "Math Fluency-Subtraction",
+    "Math Fluency-Multiplication", "Dyslexia Index3",
+]
+
+WISC_SUBTESTS = [
+    "Similarities", "Vocabulary", "Information", "Comprehension",
+    "Block Design", "Visual Puzzles", "Matrix Reasoning", "Figure Weights",
+    "Picture Concepts", "Arithmetic", "Digit Span", "Picture Span",
+    "Letter-Number Seq", "Coding", "Symbol Search",
+]
+
+WISC_INDEXES = [
+    "VCI", "VSI", "FRI", "WMI", "PSI", "FSIQ", "GAI", "CPI", "NVI", "QRI",
+    "AWMI",
+]
+
+CEFI_SCALES = [
+    "Attention", "EmotionRegulation", "Flexibility", "InhibitoryControl",
+    "Initiation", "Organization", "Planning", "SelfMonitoring",
+    "WorkingMemory",
+]
+
+CHAMP_FIELDS = [
+    "Lists", "Objects", "Instructions", "Places", "Lists Delayed",
+    "Lists Recognition", "Objects Delayed", "Instructions Delayed",
+    "Instructions Recognition", "Places Delayed", "Verbal Memory Index",
+    "Visual Memory Index", "Immediate Memory Index", "Delayed Memory Index",
+    "Total Memory Index", "Screening Index",
+]
+
+CBRS_OPTIONS = [
+    "Academics", "Impulsivity/Hyperactivity", "Inattention",
+    "Oppositional and Aggressive Behaviors", "Mood", "Anxiety",
+    "Emotional Distress", "Social Skills", "Physical Symptoms",
+    "Other Atypical Behaviors and Social Problems",
+]
+
+
+def _percentile(rng):
+    return str(rng.randint(1, 99))
+
+
+def _docx_bytes(doc):
+    output = BytesIO()
+    doc.save(output)
+    return output.getvalue()
+
+
+def make_wiat_docx(rng):
+    # Name in column 0, percentile in column 4 (see "Process WIAT Tables").
+    doc = Document()
+    table = doc.add_table(rows=1, cols=5)
+    for cell, text in zip(table.rows[0].cells, ["Composite/Subtest", "Raw", "Standard", "CI", "Percentile"]):
+        cell.text = text
+    for name in WIAT_SUBTESTS:
+        cells = table.add_row().cells
+        cells[0].text = name
+        cells[1].text = str(rng.randint(10, 60))
+        cells[2].text = str(rng.randint(70, 130))
+        cells[3].text = "90-110"
+        cells[4].text = _percentile(rng)
+    return _docx_bytes(doc)
+
+
+def make_wisc_docx(rng):
+    # Name in column 1, percentile in column 5 (see "=== WISC").
+    doc = Document()
+    for names in (WISC_SUBTESTS, WISC_INDEXES):
+        table = doc.add_table(rows=1, cols=6)
+        for cell, text in zip(table.rows[0].cells, ["Domain", "Subtest", "Raw", "Scaled", "CI", "Percentile"]):
+            cell.text = text
+        for name in names:
+            cells = table.add_row().cells
+            cells[0].text = "-"
+            cells[1].text = name
+            cells[2].text = str(rng.randint(10, 60))
+            cells[3].text = str(rng.randint(1, 19))
+            cells[4].text = "8-12"
+            cells[5].text = _percentile(rng)
+    return _docx_bytes(doc)
+
+
+def _pdf_escape(text):
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _pdf_table_stream(rows, col_width=70, row_height=18, left=20, top=760):
+    ops = ["0.5 w"]
+    n_cols = len(rows[0])
+    for r in range(len(rows) + 1):
+        y = top - r * row_height
+        ops.append(f"{left} {y} m {left + n_cols * col_width} {y} l S")
+    for c in range(n_cols + 1):
+        x = left + c * col_width
+        ops.append(f"{x} {top} m {x} {top - len(rows) * row_height} l S")
+    for r, row in enumerate(rows):
+        y = top - (r + 1) * row_height + 5
+        for c, text in enumerate(row):
+            if text:
+                x = left + c * col_width + 3
+                ops.append(f"BT /F1 8 Tf {x} {y} Td ({_pdf_escape(text)}) Tj ET")
+    return "\n".join(ops).encode("latin-1")
+
+
+def _pdf_bytes(page_streams):
+    # Minimal PDF writer so the harness needs nothing beyond requirements.txt.
+    n_pages = len(page_streams)
+    font_id = 3 + 2 * n_pages
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        (
+            "<< /Type /Pages /Kids ["
+            + " ".join(f"{3 + 2 * i} 0 R" for i in range(n_pages))
+            + f"] /Count {n_pages} >>"
+        ).encode(),
+    ]
+    for i, stream in enumerate(page_streams):
+        objects.append(
+            (
+                f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                f"/Resources << /Font << /F1 {font_id} 0 R >> >> "
+                f"/Contents {4 + 2 * i} 0 R >>"
+            ).encode()
+        )
+        objects.append(
+            f"<< /Length {len(stream)} >>\nstream\n".encode() + stream + b"\nendstream"
+        )
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    out = BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(f"{number} 0 obj\n".encode() + body + b"\nendobj\n")
+    xref = out.tell()
+    out.write(f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode())
+    for offset in offsets:
+        out.write(f"{offset:010d} 00000 n \n".encode())
+    out.write(
+        f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    )
+    return out.getvalue()
+
+
+def make_cefi_pdf(rng):
+    # The app reads the tables on page 3, drops rows 0, 1, 3, 4, takes the
+    # Total percentile from column 4 and keeps columns 0, 3 and 7.
+    header = ["Scale", "Raw", "Std", "Percentile", "", "CI", "Class", "S/W"]
+    rows = [
+        header,
+        ["", "", "", "", "", "", "", ""],
+        ["Full Scale", str(rng.randint(50, 150)), str(rng.randint(70, 130)), "", _percentile(rng), "90-110", "Avg", ""],
+        ["Scale", "", "", "", "", "", "", ""],
+        ["", "", "", "", "", "", "", ""],
+    ]
+    for scale in CEFI_SCALES:
+        rows.append([
+            scale, str(rng.randint(5, 30)), str(rng.randint(70, 130)), _percentile(rng),
+            "", "90-110", "Avg", rng.choice(["S", "W", "None"]),
+        ])
+    blank = b"BT /F1 10 Tf 72 720 Td (CEFI) Tj ET"
+    return _pdf_bytes([blank, blank, _pdf_table_stream(rows)])
+
+
+# === Session ===
+
+def fill_session(at, rng):
+    at.file_uploader(key="wiat_upload").set_value(("wiat.docx", make_wiat_docx(rng), DOCX_MIME))
+    at.file_uploader(key="wisc_upload").set_value(("wisc.docx", make_wisc_docx(rng), DOCX_MIME))
+    at.file_uploader(key="cefi_parent_upload").set_value(("cefi_parent.pdf", make_cefi_pdf(rng), PDF_MIME))
+    at.file_uploader(key="cefi_teacher_upload").set_value(("cefi_teacher.pdf", make_cefi_pdf(rng), PDF_MIME))
+
+    for field in CHAMP_FIELDS:
+        at.text_input(key=f"champ_{field}").input(_percentile(rng))
+    for field in ["Lists", "Objects", "Instructions", "Places"]:
+        at.selectbox(key=f"champ_{field}_change").select(
+            rng.choice(["improved", "decreased", "stayed the same"])
+        )
+
+    for key in ["vmi", "vp", "mc"]:
+        at.text_input(key=f"{key}_raw_input").input(str(rng.randint(10, 30)))
+        at.text_input(key=f"{key}_input").input(_percentile(rng))
+
+    for prefix in ["parent", "teacher", "self_report"]:
+        at.multiselect(key=f"{prefix}_behavior_scales").set_value(rng.sample(CBRS_OPTIONS, 3))
+        at.text_input(key=f"{prefix}_additional_problems").input("None reported")
+        at.text_input(key=f"{prefix}_additional_comments").input("Load test session")
+        at.text_input(key=f"{prefix}_strengths").input("Kind and curious")
+
+    at.radio(key="gender").set_value(rng.choice(["Male", "Female"]))
+
+
+def _check(at, stage):
+    if at.exception:
+        raise RuntimeError(f"{stage} raised: {at.exception[0].message}")
+    if at.error:
+        raise RuntimeError(f"{stage} reported: {at.error[0].value}")
+
+
+_start_barrier = None
+
+
+def _init_worker(barrier):
+    global _start_barrier
+    _start_barrier = barrier
+    os.chdir(APP_DIR)  # the app opens its templates by relative path
+    # The app's unlabelled widgets log a warning with a stack on every run.
+    # Parse the config first: that resets the level from ``logger.level``.
+    from streamlit import config, logger
+    config.get_option("logger.level")
+    logger.set_log_level("error")
+
+
+def run_session(session_id, requests, seed, timeout):
+    from streamlit.testing.v1 import AppTest
+
+    rng = random.Random(seed + session_id)
+    at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    at.run()
+    _check(at, "initial run")
+
+    _start_barrier.wait()
+    started = time.time()
+    upload_latencies = []
+    generate_latencies = []
+    failures = []
+    for _ in range(requests):
+        try:
+            fill_session(at, rng)
+            t0 = time.perf_counter()
+            at.run()
+            upload_latencies.append(time.perf_counter() - t0)
+            _check(at, "upload run")
+
+            t0 = time.perf_counter()
+            at.button[0].click().run()
+            generate_latencies.append(time.perf_counter() - t0)
+            _check(at, "generate run")
+            if not at.session_state["generated_report"]:
+                raise RuntimeError("generate run produced no report")
+        except Exception as e:
+            failures.append(str(e))
+
+    return {
+        "started": started,
+        "finished": time.time(),
+        "upload": upload_latencies,
+        "generate": generate_latencies,
+        "failures": failures,
+        # ru_maxrss is in KiB on Linux and bytes on macOS
+        "peak_rss_kib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        // (1024 if sys.platform == "darwin" else 1),
+    }
+
+
+# === Reporting ===
+
+def summarize(latencies):
+    if not latencies:
+        return "n/a"
+    ordered = sorted(latencies)
+    if len(ordered) > 1:
+        cuts = statistics.quantiles(ordered, n=100, method="inclusive")
+        p50, p95, p99 = cuts[49], cuts[94], cuts[98]
+    else:
+        p50 = p95 = p99 = ordered[0]
+    return (
+        f"p50={p50 * 1000:.0f}ms p95={p95 * 1000:.0f}ms "
+        f"p99={p99 * 1000:.0f}ms max={ordered[-1] * 1000:.0f}ms"
+    )
+
+
+def p95(latencies):
+    if len(latencies) < 2:
+        return latencies[0] if latencies else 0.0
+    return statistics.quantiles(sorted(latencies), n=100, method="inclusive")[94]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=4, help="concurrent simulated sessions")
+    parser.add_argument("--requests", type=int, default=3, help="Generate clicks per session")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the synthetic scores")
+    parser.add_argument("--timeout", type=float, default=120, help="per-run timeout in seconds")
+    parser.add_argument(
+        "--max-p95", type=float, default=None,
+        help="exit non-zero if the Generate p95 latency exceeds this many seconds",
+    )
+    args = parser.parse_args(argv)
+
+    ctx = multiprocessing.get_context("spawn")
+    barrier = ctx.Barrier(args.sessions)
+    with ProcessPoolExecutor(
+        max_workers=args.sessions,
+        mp_context=ctx,
+        initializer=_init_worker,
+        initargs=(barrier,),
+    ) as pool:
+        futures = [
+            pool.submit(run_session, i, args.requests, args.seed, args.timeout)
+            for i in range(args.sessions)
+        ]
+        results = [f.result() for f in futures]
+
+    upload = [t for r in results for t in r["upload"]]
+    generate = [t for r in results for t in r["generate"]]
+    failures = [f for r in results for f in r["failures"]]
+    wall = max(r["finished"] for r in results) - min(r["started"] for r in results)
+    peaks = [r["peak_rss_kib"] / 1024 for r in results]
+
+    print(f"Sessions: {args.sessions}  Requests/session: {args.requests}  Wall: {wall:.2f}s")
+    print(f"Upload run:   {summarize(upload)}")
+    print(f"Generate run: {summarize(generate)}")
+    print(f"Throughput:   {len(generate) / wall if wall else 0:.2f} reports/s")
+    print(f"Peak RSS:     max {max(peaks):.0f} MiB/session, sum {sum(peaks):.0f} MiB")
+    if failures:
+        print(f"Failures:     {len(failures)}")
+        for failure in sorted(set(failures)):
+            print(f"  - {failure}")
+
+    if failures:
+        return 1
+    if args.max_p95 is not None and p95(generate) > args.max_p95:
+        print(f"Generate p95 exceeds --max-p95 {args.max_p95:.2f}s")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())